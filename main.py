@@ -13,6 +13,19 @@ import sys
 
 import websockets
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+logger = logging.getLogger(__name__)
+
 
 class OnlinePythonClient:
     uri = 'wss://repl.online-cpp.com/socket.io/?type=script&lang=python3&EIO=3&transport=websocket'
@@ -39,37 +52,97 @@ class OnlinePythonClient:
         self.websocket = None
         self.output_type = None
         self.reader = None
+        self._recv_task = None
+        self._stdin_task = None
+        self._writer_task = None
+        self._send_queue = asyncio.Queue()
+        self._flush_handles = {}
+
+        # Cache enum members on the instance: one attribute lookup per reference in the hot handle_message match
+        # (module-level names would be capture patterns inside `case`, so dotted instance attributes are used).
+        self._S_CONNECTED = self.State.CONNECTED
+        self._S_INITIALIZED = self.State.INITIALIZED
+        self._S_WAITING_FOR_CODE = self.State.WAITING_FOR_CODE
+        self._S_RUNNING = self.State.RUNNING
+        self._S_EXPECTING_OUTPUT = self.State.EXPECTING_OUTPUT
+        self._S_SESSION_KILLED = self.State.SESSION_KILLED
+        self._O_OUTPUT = self.OutputType.OUTPUT
+        self._O_ERROR = self.OutputType.ERROR
+        self._O_INPUT = self.OutputType.INPUT
+        self._output_files = {
+            self._O_OUTPUT: sys.stdout,
+            self._O_ERROR: sys.stderr,
+            self._O_INPUT: None,
+        }
 
         self.files = files
         self.cli_args = cli_args
 
+        # Serialize the run request up front so connecting does not pay for json.dumps of the file contents.
+        self._run_payload = '42' + _json_dumps(
+            ['code', [{'code': code, 'file_name': file_name} for file_name, code in files.items()],
+             ' '.join(cli_args), next(iter(files))])
+
     @property
     def state(self):
         return self._state
 
     @state.setter
     def state(self, new_state):
-        logging.info(f'State: {new_state.value!r}')
+        logger.info('State: %r', new_state.value)
         self._state = new_state
 
-    async def handle_next_message(self):
-        await self.handle_message(await self.websocket.recv())
+    def _schedule_flush(self, file):
+        # Coalesce flushes so a burst of output frames hits the kernel once per ~5ms instead of once per line.
+        handle = self._flush_handles.get(file)
+        if handle is not None:
+            handle.cancel()
+        self._flush_handles[file] = asyncio.get_running_loop().call_later(0.005, file.buffer.flush)
 
-    async def handle_next_user_input(self):
-        data = await self.reader.readline()
-        data = data.decode().rstrip('\n')
-        await self.send_input(data)
+    async def handle_next_message(self):
+        await self.handle_message(await self.websocket.recv(decode=False))
+
+    async def _recv_loop(self):
+        while True:
+            await self.handle_next_message()
+
+    async def _stdin_loop(self):
+        # Read stdin in bounded chunks and split lines locally, so newline-free input
+        # cannot grow the reader buffer without bound.
+        pending = b''
+        while True:
+            chunk = await self.reader.read(65536)
+            if not chunk:
+                if pending:
+                    await self.send_input(pending.decode())
+                return
+            pending += chunk
+            *lines, pending = pending.split(b'\n')
+            for line in lines:
+                await self.send_input(line.decode())
+
+    async def _writer_loop(self):
+        while True:
+            # Drain everything queued so far and send it back-to-back, letting the transport coalesce the writes.
+            messages = [await self._send_queue.get()]
+            while not self._send_queue.empty():
+                messages.append(self._send_queue.get_nowait())
+            for message in messages:
+                await self.websocket.send(message)
 
     async def connect(self):
         assert self.state == self.State.DISCONNECTED
-        async with websockets.connect(OnlinePythonClient.uri) as websocket:
-            # Close the connection when receiving SIGTERM.
+        async with websockets.connect(OnlinePythonClient.uri, max_queue=None, compression=None,
+                                      write_limit=2 ** 20) as websocket:
+            # Schedule tasks eagerly so coroutines run up to their first real await without an event-loop hop.
             loop = asyncio.get_running_loop()
-            loop.add_signal_handler(signal.SIGTERM, loop.create_task, websocket.close())
+            loop.set_task_factory(asyncio.eager_task_factory)
+
+            # Close the connection when receiving SIGTERM.
+            loop.add_signal_handler(signal.SIGTERM, lambda: loop.create_task(websocket.close()))
 
             # Initialize async stdin reader
-            loop = asyncio.get_event_loop()
-            reader = asyncio.StreamReader()
+            reader = asyncio.StreamReader(limit=1 << 20, loop=loop)
             protocol = asyncio.StreamReaderProtocol(reader)
             await loop.connect_read_pipe(lambda: protocol, sys.stdin)
             self.reader = reader
@@ -79,103 +152,97 @@ class OnlinePythonClient:
             self.state = self.State.CONNECTED
 
             # Process messages received on the connection.
-            funcs = [
-                self.handle_next_message,
-                self.handle_next_user_input,
-            ]
-            tasks = [asyncio.create_task(func()) for func in funcs]
-            while True:
-                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
-                tasks = [asyncio.create_task(func()) if task.done() else task for (func, task) in zip(funcs, tasks)]
+            self._recv_task = asyncio.create_task(self._recv_loop())
+            self._stdin_task = asyncio.create_task(self._stdin_loop())
+            self._writer_task = asyncio.create_task(self._writer_loop())
+            await asyncio.gather(self._recv_task, self._stdin_task, self._writer_task)
 
     async def send_list(self, l: list):
-        message = '42' + json.dumps(l)
-        logging.info(f'Sending: {l!r}')
-        logging.debug(f'Sending (RAW): {message!r}')
-        await self.websocket.send(message)
+        message = '42' + _json_dumps(l)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Sending: %r', l)
+            logger.debug('Sending (RAW): %r', message)
+        self._send_queue.put_nowait(message)
 
     async def kill_session(self):
-        await self.websocket.send('41')
+        self._send_queue.put_nowait('41')
 
     async def send_files_and_run(self):
-        data = ['code', [dict(code=code, file_name=file_name) for file_name, code in self.files.items()],
-                ' '.join(self.cli_args), next(iter(self.files))]
-        await self.send_list(data)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Sending code for files: %r', list(self.files))
+            logger.debug('Sending (RAW): %r', self._run_payload)
+        self._send_queue.put_nowait(self._run_payload)
 
     async def send_input(self, message):
         data = ['message', message]
         await self.send_list(data)
 
     async def handle_message(self, message):
-        logging.debug(f'Receiving (RAW): {message!r}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Receiving (RAW): %r', message)
         match self.state:
-            case self.State.CONNECTED:
-                assert message.startswith('0{')
-                self.state = self.State.INITIALIZED
+            case self._S_CONNECTED:
+                assert message.startswith(b'0{')
+                self.state = self._S_INITIALIZED
 
-            case self.State.INITIALIZED:
-                assert message == '40'
-                self.state = self.State.WAITING_FOR_CODE
+            case self._S_INITIALIZED:
+                assert message == b'40'
+                self.state = self._S_WAITING_FOR_CODE
                 await self.send_files_and_run()
-                self.state = self.State.RUNNING
-
-            case self.State.RUNNING:
-                match message[:2]:
-                    case '45':
-                        assert message.startswith('451-')
-                        data = json.loads(message[4:])
+                self.state = self._S_RUNNING
+
+            case self._S_RUNNING:
+                # Scan the frame prefix once instead of repeated startswith/slice calls.
+                prefix = message[:4]
+                match prefix[:2]:
+                    case b'45':
+                        assert prefix == b'451-'
+                        data = _json_loads(message[4:])
                         match data[0]:
                             case 'output':
-                                self.output_type = self.OutputType.OUTPUT
-                                self.state = self.State.EXPECTING_OUTPUT
+                                self.output_type = self._O_OUTPUT
+                                self.state = self._S_EXPECTING_OUTPUT
                             case 'err':
-                                self.output_type = self.OutputType.ERROR
-                                self.state = self.State.EXPECTING_OUTPUT
+                                self.output_type = self._O_ERROR
+                                self.state = self._S_EXPECTING_OUTPUT
                             case 'input':
-                                self.output_type = self.OutputType.INPUT
-                                self.state = self.State.EXPECTING_OUTPUT
+                                self.output_type = self._O_INPUT
+                                self.state = self._S_EXPECTING_OUTPUT
                             case output_type:
                                 raise NotImplementedError(output_type)
-                    case '42':
-                        data = json.loads(message[2:])
+                    case b'42':
+                        data = _json_loads(message[2:])
                         method, string, number = data
                         match method:
                             case 'exit':
                                 if 'Process exited' in string:
-                                    logging.info(f'Exiting: {string!r}')
-                                else:
-                                    logging.critical(f'Exiting: {string!r}')
-
-                                if number is None:
-                                    os._exit(number)
+                                    logger.info('Exiting: %r', string)
                                 else:
-                                    os._exit(int(number))
+                                    logger.critical('Exiting: %r', string)
+
+                                # os._exit skips stdio cleanup, so flush the coalesced output buffers first.
+                                for handle in self._flush_handles.values():
+                                    handle.cancel()
+                                sys.stdout.buffer.flush()
+                                sys.stderr.buffer.flush()
+                                os._exit(0 if number is None else number)
                             case _:
                                 raise NotImplementedError(method)
 
-                    case '41':
-                        self.state = self.State.SESSION_KILLED
+                    case b'41':
+                        self.state = self._S_SESSION_KILLED
 
                     case message_type:
                         raise NotImplementedError(message_type)
 
-            case self.State.EXPECTING_OUTPUT:
-                match self.output_type:
-                    case self.OutputType.OUTPUT:
-                        file = sys.stdout
-                    case self.OutputType.ERROR:
-                        file = sys.stderr
-                    case self.OutputType.INPUT:
-                        file = None
-                    case output_type:
-                        raise NotImplementedError(output_type)
-
+            case self._S_EXPECTING_OUTPUT:
+                file = self._output_files[self.output_type]
                 if file:
-                    if type(message) is bytes:
-                        message = message.decode()
-                    logging.info(f'{self.output_type}: {message!r}')
-                    print(message, file=file)
-                self.state = self.State.RUNNING
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info('%s: %r', self.output_type, message)
+                    file.buffer.write(message + b'\n')
+                    self._schedule_flush(file)
+                self.state = self._S_RUNNING
 
             case state:
                 raise NotImplementedError(state)
@@ -205,12 +272,17 @@ async def main():
     else:
         logging.basicConfig(level=logging.ERROR)
 
+    # Buffer program output; flushing is coalesced by the client instead of happening per line.
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
+    sys.stderr.reconfigure(line_buffering=False, write_through=False)
+
     # Process parsed arguments further
     files = ((args.run and [args.run[0]]) or []) + args.files
     cli_args = args.run and args.run[1:]
 
-    # Read file contents
-    files = {Path(file_name).name: Path(file_name).read_text() for file_name in args.files}
+    # Read file contents concurrently without blocking the event loop
+    contents = await asyncio.gather(*(asyncio.to_thread(Path(file_name).read_text) for file_name in args.files))
+    files = dict(zip((Path(file_name).name for file_name in args.files), contents))
 
     # Run websocket client
     client = OnlinePythonClient(files=files, cli_args=cli_args)
@@ -218,4 +290,10 @@ async def main():
 
 
 if __name__ == '__main__':
+    try:
+        import uvloop
+    except ImportError:
+        pass  # uvloop is unavailable e.g. on Windows; keep the default event loop.
+    else:
+        uvloop.install()
     asyncio.run(main())